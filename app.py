@@ -3,7 +3,7 @@ import csv
 import io
 import datetime
 from flask import Flask, request, render_template, jsonify, Response
-from scraper import scrape_stockist
+from scraper import scrape_stockist, dump_rows_ndjson
 
 app = Flask(__name__)
 
@@ -35,16 +35,21 @@ def scrape():
     if request.args.get("format") == "json":
         return jsonify(rows)
 
+    # /scrape?url=...&format=ndjson : une ligne JSON par store
+    if request.args.get("format") == "ndjson":
+        bio = io.BytesIO()
+        dump_rows_ndjson(rows, bio)
+        return Response(bio.getvalue(), mimetype="application/x-ndjson")
+
     # Génération CSV
     fieldnames = [
         "name", "address1", "address2", "city", "state", "postal_code",
         "country", "phone", "website", "lat", "lng", "address_full"
     ]
     sio = io.StringIO()
-    writer = csv.DictWriter(sio, fieldnames=fieldnames)
-    writer.writeheader()
-    for r in rows:
-        writer.writerow({k: r.get(k, "") for k in fieldnames})
+    writer = csv.writer(sio)
+    writer.writerow(fieldnames)
+    writer.writerows([[r.get(k, "") for k in fieldnames] for r in rows])
 
     csv_bytes = sio.getvalue().encode("utf-8-sig")
     filename = f"stores_{datetime.datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
@@ -1,11 +1,37 @@
 import os
+import math
 import re
+import codecs
+import random
+import time
 import csv
+import sys
 import json
 import typing as t
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+try:
+    import orjson  # (dé)codage JSON plus rapide ; optionnel
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj: t.Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _env_int(name: str, default: int, minimum: int) -> int:
+    # valeur vide ou invalide → défaut ; jamais en dessous de minimum
+    try:
+        value = int(os.getenv(name, "").strip())
+    except ValueError:
+        return default
+    return max(minimum, value)
 
 STOCKIST_DEBUG = os.getenv("STOCKIST_DEBUG", "0") not in ("0", "", "false", "False", "FALSE")
 STOCKIST_ACCOUNT_ENV = os.getenv("STOCKIST_ACCOUNT", "").strip()
@@ -15,110 +41,224 @@ USER_AGENT = (
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
     "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
 )
+HTML_HEADERS = {"Accept": "text/html,application/xhtml+xml"}
 HTTP_TIMEOUT = 30
-PER_PAGE = 200
+RETRY_AFTER_MAX = 10  # secondes d'attente max demandées par un Retry-After
+# Monter la taille de page (ex: 500) réduit les allers-retours si le compte l'accepte ;
+# attention, un serveur qui plafonne en dessous fera croire à une dernière page.
+PER_PAGE = _env_int("STOCKIST_PER_PAGE", 200, 1)
+PAGE_CONCURRENCY = 4  # pages JSON demandées en parallèle au-delà de la page 1
+CACHE_TTL = _env_int("STOCKIST_CACHE_TTL", 3600, 0)  # secondes ; 0 = pas de cache des résultats
+STREAM_CHUNK = 16384
+STREAM_OVERLAP = 256  # un store_id + son contexte tient largement là-dedans
+
+
+class _JitterRetry(Retry):
+    # backoff exponentiel + un peu d'aléa pour ne pas retaper le serveur en rafale
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        return backoff + random.uniform(0, backoff / 2) if backoff else backoff
+
+    # Retry-After plafonné : un "Retry-After: 600" ne doit pas bloquer un worker gunicorn
+    def get_retry_after(self, response: t.Any) -> t.Optional[float]:
+        retry_after = super().get_retry_after(response)
+        return min(retry_after, RETRY_AFTER_MAX) if retry_after is not None else None
+
+
+def _make_session() -> requests.Session:
+    # Session partagée : keep-alive + pool pour éviter un handshake TLS par requête
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=_JitterRetry(
+            total=None,
+            status=5,  # 429/5xx de passerelle uniquement, cf. status_forcelist
+            connect=1,  # une seule nouvelle tentative si la connexion échoue
+            read=False,  # jamais après un timeout de lecture : ReadTimeout remonte tel quel
+            other=0,  # total=None : sans ça les autres erreurs seraient retentées sans fin
+            backoff_factor=0.5,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        ),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_SESSION = _make_session()
 
 
-def _log(msg: str) -> None:
+def _log(msg: str, *args: t.Any) -> None:
+    # formatage paresseux (%-style) : rien n'est construit quand le debug est coupé.
+    # Ligne écrite d'un bloc (\n inclus) pour ne pas s'entremêler entre threads.
     if STOCKIST_DEBUG:
-        print(f"[stockist] DEBUG: {msg}", flush=True)
+        print(f"[stockist] DEBUG: {msg % args if args else msg}\n", end="", flush=True)
 
 
 # ---------- Normalisation ----------
 
-@dataclass
-class NormStore:
-    name: str = ""
-    address1: str = ""
-    address2: str = ""
-    city: str = ""
-    region: str = ""
-    postal_code: str = ""
-    country: str = ""
-    phone: str = ""
-    website: str = ""
-    lat: t.Optional[float] = None
-    lng: t.Optional[float] = None
-
-    def to_row(self) -> dict:
-        return {
-            "name": self.name,
-            "address1": self.address1,
-            "address2": self.address2,
-            "city": self.city,
-            "region": self.region,
-            "postal_code": self.postal_code,
-            "country": self.country,
-            "phone": self.phone,
-            "website": self.website,
-            "lat": self.lat,
-            "lng": self.lng,
-        }
-
-
-def normalize_item(item: dict) -> NormStore:
-    name = item.get("name") or item.get("store_name") or ""
-    address1 = item.get("address1") or ""
-    address2 = item.get("address2") or ""
-    city = item.get("city") or ""
-    region = item.get("region") or item.get("state") or ""
-    postal_code = item.get("postal_code") or item.get("zip") or ""
-    country = item.get("country") or ""
-    phone = item.get("phone") or ""
-    website = item.get("website") or item.get("url") or ""
-    lat = item.get("lat") or item.get("latitude")
-    lng = item.get("lng") or item.get("longitude")
-    try:
-        lat = float(lat) if lat is not None else None
-    except Exception:
-        lat = None
-    try:
-        lng = float(lng) if lng is not None else None
-    except Exception:
-        lng = None
-    return NormStore(
-        name=name,
-        address1=address1,
-        address2=address2,
-        city=city,
-        region=region,
-        postal_code=postal_code,
-        country=country,
-        phone=phone,
-        website=website,
-        lat=lat,
-        lng=lng,
-    )
+# champ normalisé → clés possibles côté Stockist, par ordre de priorité
+_FIELD_MAP = (
+    ("name", ("name", "store_name")),
+    ("address1", ("address1",)),
+    ("address2", ("address2",)),
+    ("city", ("city",)),
+    ("region", ("region", "state")),
+    ("postal_code", ("postal_code", "zip")),
+    ("country", ("country",)),
+    ("phone", ("phone",)),
+    ("website", ("website", "url")),
+)
+
+
+FIELDNAMES = tuple(k for k, _ in _FIELD_MAP) + ("lat", "lng")
+
+
+def _first(item: dict, keys: t.Tuple[str, ...]) -> t.Any:
+    for k in keys:
+        v = item.get(k)
+        if v:
+            return v
+    return ""
+
+
+def _to_float(v: t.Any) -> t.Optional[float]:
+    # l'API renvoie presque toujours des nombres → pas de try/except dans ce cas.
+    # NaN/inf → None : pas de JSON valide pour eux (json.dumps écrirait NaN, orjson null)
+    if v is None:
+        return None
+    if type(v) is not float:
+        try:
+            v = float(v)
+        except (TypeError, ValueError, OverflowError):
+            return None
+    return v if math.isfinite(v) else None
+
+
+def normalize_item(item: dict) -> dict:
+    row = {k: _first(item, keys) for k, keys in _FIELD_MAP}
+    row["lat"] = _to_float(item.get("lat") or item.get("latitude"))
+    row["lng"] = _to_float(item.get("lng") or item.get("longitude"))
+    return row
+
+
+def dump_rows_ndjson(rows: t.Iterable[dict], fp: t.BinaryIO) -> None:
+    """Écrit les lignes en NDJSON (un objet JSON par ligne) dans un flux binaire."""
+    fp.writelines(_json_dumps(r) + b"\n" for r in rows)
 
 
 # ---------- Endpoints helpers ----------
 
+# ordre de tentative – on élargit le spectre
+_ENDPOINT_TEMPLATES = (
+    "{base}/locations.json?page={page}&per_page={per_page}",
+    "{base}/locations?page={page}&per_page={per_page}",
+    "{base}/locations/overview.json?page={page}&per_page={per_page}",
+    "{base}/locations/overview.js?page={page}&per_page={per_page}",
+    "{base}/locations/overview?page={page}&per_page={per_page}",
+    "{base}/locations.js?page={page}&per_page={per_page}",
+)
+
+
+@lru_cache(maxsize=32)
 def api_base(account: str) -> str:
     return f"https://stockist.co/api/v1/{account}"
 
 
-def build_candidates(account: str, page: int) -> t.List[str]:
+def endpoint_url(account: str, idx: int, page: int, per_page: int = PER_PAGE) -> str:
+    return _ENDPOINT_TEMPLATES[idx].format(base=api_base(account), page=page, per_page=per_page)
+
+
+def build_candidates(account: str, page: int, per_page: int = PER_PAGE) -> t.List[str]:
     base = api_base(account)
-    # ordre de tentative – on élargit le spectre
-    return [
-        f"{base}/locations.json?page={page}&per_page={PER_PAGE}",
-        f"{base}/locations?page={page}&per_page={PER_PAGE}",
-        f"{base}/locations/overview.json?page={page}&per_page={PER_PAGE}",
-        f"{base}/locations/overview.js?page={page}&per_page={PER_PAGE}",
-        f"{base}/locations/overview?page={page}&per_page={PER_PAGE}",
-        f"{base}/locations.js?page={page}&per_page={PER_PAGE}",
-    ]
+    return [tpl.format(base=base, page=page, per_page=per_page) for tpl in _ENDPOINT_TEMPLATES]
 
 
 # ---------- Parseurs JS ----------
 
-LIKELY_KEYS = {"name", "store_name", "address1", "city", "country", "postal_code", "lat", "lng", "latitude", "longitude"}
+LIKELY_KEYS = frozenset({"name", "store_name", "address1", "city", "country", "postal_code", "lat", "lng", "latitude", "longitude"})
+
+_JS_LOCATIONS_RE = re.compile(r"locations\s*[:=]\s*(?=\[)")   # Stockist.locations = [...] / locations:[...]
+_JS_ARRAY_START_RE = re.compile(r"\[\s*\{")
+# Seuls les crochets et les chaînes JSON (échappements compris) comptent pour l'équilibrage.
+# Une chaîne jamais fermée va jusqu'à la fin du texte : pas de re-balayage.
+_JS_TOKEN_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*(?:"|\Z)|[\[\]]', re.S)
+# 2e passage, si le 1er ne trouve rien : on connaît aussi la syntaxe JS autour
+# ('...', `...`, commentaires, regex /.../ après un opérateur) pour qu'un '"' isolé
+# dans le code ('"', /"/g…) ne fasse pas prendre tout le reste pour une chaîne.
+# Les chaînes '...' / "..." s'arrêtent en fin de ligne, comme en JS.
+_JS_CODE_TOKEN_RE = re.compile(r"""
+    "[^"\\\n]*(?:\\.[^"\\\n]*)*"?
+  | '[^'\\\n]*(?:\\.[^'\\\n]*)*'?
+  | `[^`\\]*(?:\\.[^`\\]*)*(?:`|\Z)
+  | //[^\n]*
+  | /\*.*?(?:\*/|\Z)
+  | (?:(?<=[\[(,=:!&|?{};])|(?<=[\[(,=:!&|?{};]\s))/(?:[^/\\\n]|\\.)+/
+  | [\[\]]
+""", re.S | re.X)
+
+
+def _dict_array_spans(text: str, token_re: t.Pattern[str] = _JS_TOKEN_RE) -> t.Dict[int, int]:
+    """
+    Un seul passage sur le texte avec une pile des '[' ouverts : renvoie
+    début → fin de chaque tableau "[{...}]" équilibré (imbriqués compris).
+    Les '[' jamais refermés restent sur la pile et sont ignorés.
+    """
+    spans: t.Dict[int, int] = {}
+    stack: t.List[int] = []
+    for m in token_re.finditer(text):
+        tok = m.group(0)
+        if tok == "[":
+            stack.append(m.start())
+        elif tok == "]" and stack:
+            start = stack.pop()
+            if _JS_ARRAY_START_RE.match(text, start):
+                spans[start] = m.end()
+    return spans
+
+
+def _load_dict_array(text: str, start: int, end: int) -> t.Optional[t.List[dict]]:
+    try:
+        arr = _json_loads(text[start:end])
+    except Exception:
+        return None
+    if isinstance(arr, list) and arr and isinstance(arr[0], dict):
+        return arr
+    return None
+
 
-def looks_like_store_dict(d: dict) -> bool:
-    if not isinstance(d, dict):
-        return False
-    keys = set(d.keys())
-    return bool(keys & LIKELY_KEYS)
+def _dict_array_candidates(text: str, spans: t.Dict[int, int]) -> t.List[t.List[dict]]:
+    candidates: t.List[t.List[dict]] = []
+
+    # 1) Tableaux affectés à "locations" (prioritaires en cas d'égalité de score)
+    done: t.Set[int] = set()
+    for m in _JS_LOCATIONS_RE.finditer(text):
+        start = m.end()
+        if start in spans and start not in done:
+            arr = _load_dict_array(text, start, spans[start])
+            if arr:
+                candidates.append(arr)
+                done.add(start)
+
+    # 2) Fall-back large: tous les tableaux "[{...}]", dans l'ordre du texte.
+    # Un tableau décodé couvre ses tableaux imbriqués ; sinon on essaie ceux-ci.
+    covered = -1
+    for start in sorted(spans):
+        if start < covered:
+            continue
+        if start in done:
+            covered = spans[start]
+            continue
+        arr = _load_dict_array(text, start, spans[start])
+        if arr:
+            candidates.append(arr)
+            covered = spans[start]
+    return candidates
 
 
 def parse_overview_js(text: str) -> t.List[dict]:
@@ -130,42 +270,15 @@ def parse_overview_js(text: str) -> t.List[dict]:
         _log("[JS] first 600 chars ↓")
         _log(text[:600].replace("\n", "\\n"))
 
-    candidates: t.List[t.List[dict]] = []
-
-    # 1) Patterns ciblés
-    patterns = [
-        r"locations\s*=\s*(\[\s*\{.*?\}\s*\])\s*;?",   # Stockist.locations = [...]
-        r"=\s*(\[\s*\{.*?\}\s*\])\s*;?",              # var foo = [...]
-        r"locations\s*:\s*(\[\s*\{.*?\}\s*\])",       # locations:[...]
-    ]
-    for pat in patterns:
-        m = re.search(pat, text, re.S)
-        if m:
-            try:
-                arr = json.loads(m.group(1))
-                if isinstance(arr, list) and arr and isinstance(arr[0], dict):
-                    candidates.append(arr)
-            except Exception:
-                pass
-
-    # 2) Fall-back large: toutes les séquences "[{...}]"
-    for m in re.finditer(r"\[\s*\{.*?\}\s*\]", text, re.S):
-        s = m.group(0)
-        try:
-            arr = json.loads(s)
-            if isinstance(arr, list) and arr and isinstance(arr[0], dict):
-                candidates.append(arr)
-        except Exception:
-            continue
+    candidates = _dict_array_candidates(text, _dict_array_spans(text))
+    if not candidates:
+        candidates = _dict_array_candidates(text, _dict_array_spans(text, _JS_CODE_TOKEN_RE))
 
     # Sélectionne la meilleure candidate (max de clés probables sur le 1er élément)
     best: t.List[dict] = []
     best_score = -1
     for arr in candidates:
-        score = 0
-        for k in arr[0].keys():
-            if k in LIKELY_KEYS:
-                score += 1
+        score = sum(1 for k in arr[0] if k in LIKELY_KEYS)
         if score > best_score:
             best = arr
             best_score = score
@@ -173,88 +286,171 @@ def parse_overview_js(text: str) -> t.List[dict]:
     return best
 
 
+def _decode_body(buf: bytes, encoding: t.Optional[str]) -> str:
+    # charset déclaré par le serveur, sinon UTF-8 (évite la détection chardet de r.text)
+    try:
+        return buf.decode(encoding or "utf-8", errors="replace")
+    except LookupError:
+        return buf.decode("utf-8", errors="replace")
+
+
 def try_fetch_endpoint(url: str, headers: dict) -> t.Tuple[bool, t.Union[list, None]]:
-    _log(f"[API] TRY {url}")
-    r = requests.get(url, headers=headers, timeout=HTTP_TIMEOUT)
+    _log("[API] TRY %s", url)
+    r = _SESSION.get(url, headers=headers, timeout=HTTP_TIMEOUT)
     if r.status_code == 404:
         _log("[API] 404 → next pattern")
         return False, None
     r.raise_for_status()
 
     ct = (r.headers.get("Content-Type") or "").lower()
-    txt = r.text or ""
+    buf = r.content or b""  # octets bruts : pas de décodage texte tant qu'on n'en a pas besoin
 
-    # JSON direct ?
-    if "application/json" in ct or txt.strip().startswith("["):
-        try:
-            data = r.json()
-            if isinstance(data, list):
-                return True, data
-        except Exception:
-            pass
+    # JSON direct ? Un seul décodage, quel que soit le Content-Type annoncé
+    try:
+        data = _json_loads(buf)
+    except Exception:
+        data = None
+    if isinstance(data, list):
+        return True, data
 
     # JS (overview / autres variantes)
-    if "javascript" in ct or url.endswith(".js") or "text/html" in ct:
-        data = parse_overview_js(txt)
+    if "javascript" in ct or url.split("?", 1)[0].endswith(".js") or "text/html" in ct:
+        data = parse_overview_js(_decode_body(buf, r.encoding))
         if data:
             return True, data
 
-    # Dernier essai: parse JSON quoi qu'il arrive
-    try:
-        data = r.json()
-        if isinstance(data, list):
-            return True, data
-    except Exception:
-        pass
-
     _log("[API] unrecognized payload on this endpoint")
     return False, None
 
 
+# account → index du pattern d'endpoint qui a répondu (cf. _ENDPOINT_TEMPLATES)
+_ENDPOINT_CACHE: t.Dict[str, int] = {}
+
+
+def probe_endpoints(account: str, headers: dict) -> int:
+    """
+    Teste en parallèle tous les patterns d'endpoint, avec une seule ligne par
+    page (per_page=1) pour que le sondage reste léger.
+    On garde l'ordre de préférence de build_candidates : un pattern gagne dès
+    que tous ceux qui le précèdent ont échoué. Retourne l'index du gagnant.
+    """
+    candidates = build_candidates(account, 1, per_page=1)
+    results: t.List[t.Optional[tuple]] = [None] * len(candidates)
+    errors: t.List[Exception] = []
+
+    ex = ThreadPoolExecutor(max_workers=len(candidates))
+    try:
+        futures = {ex.submit(try_fetch_endpoint, url, headers): i for i, url in enumerate(candidates)}
+        for fut in as_completed(futures):
+            try:
+                results[futures[fut]] = fut.result()
+            except Exception as e:
+                errors.append(e)
+                results[futures[fut]] = (False, None)
+
+            for i, res in enumerate(results):
+                if res is None:
+                    break  # un pattern prioritaire n'a pas encore répondu
+                ok, payload = res
+                if ok and payload:
+                    return i
+    finally:
+        # on n'attend pas les requêtes perdantes
+        ex.shutdown(wait=False, cancel_futures=True)
+
+    # Aucun store : on accepte un endpoint valide mais vide
+    for i, (ok, _) in enumerate(results):
+        if ok:
+            return i
+    if errors:
+        raise errors[0]
+    raise requests.HTTPError(f"All endpoints 404/unsupported for account {account}.")
+
+
+# account → (instant du scrape, lignes) ; évite de tout re-télécharger pour un même compte
+_ROWS_CACHE: t.Dict[str, t.Tuple[float, t.List[dict]]] = {}
+
+
 def fetch_all_locations(account: str, referer_url: str) -> t.List[dict]:
-    rows: t.List[dict] = []
-    headers = {
-        "User-Agent": USER_AGENT,
-        "Accept": "application/json,text/javascript,application/javascript,text/html,*/*",
-        "Referer": referer_url,
-    }
+    if CACHE_TTL > 0:
+        now = time.monotonic()
+        hit = _ROWS_CACHE.get(account)
+        if hit and now - hit[0] < CACHE_TTL:
+            _log("[CACHE] account=%s rows=%s", account, len(hit[1]))
+            return list(hit[1])
 
-    page = 1
+    rows = list(iter_all_locations(account, referer_url))
+
+    if CACHE_TTL > 0:
+        now = time.monotonic()
+        for acc, (ts, _) in list(_ROWS_CACHE.items()):
+            if now - ts >= CACHE_TTL:
+                _ROWS_CACHE.pop(acc, None)
+        _ROWS_CACHE[account] = (now, rows)
+    return list(rows)
+
+
+def iter_all_locations(account: str, referer_url: str) -> t.Iterator[dict]:
+    """
+    Lignes normalisées page par page : l'appelant peut les écrire au fil de
+    l'eau (CSV…) sans tout garder en mémoire.
+    """
     total = 0
-    while True:
-        got = False
-        for endpoint in build_candidates(account, page):
-            ok, payload = try_fetch_endpoint(endpoint, headers)
-            if not ok:
-                continue
+    headers = {"Accept": "application/json,text/javascript,application/javascript,text/html,*/*"}
+    if referer_url:
+        headers["Referer"] = referer_url
+
+    # Endpoint déjà connu pour ce compte → on évite le sondage
+    idx = _ENDPOINT_CACHE.get(account)
+    if idx is not None:
+        ok, payload = try_fetch_endpoint(endpoint_url(account, idx, 1), headers)
+        if not ok:
+            _log("[API] cached endpoint #%s failed → probing", idx)
+            idx = None
+    if idx is None:
+        idx = probe_endpoints(account, headers)
+        _ENDPOINT_CACHE[account] = idx
+        # le sondage n'a lu qu'une ligne : vraie page 1 sur le pattern gagnant
+        ok, payload = try_fetch_endpoint(endpoint_url(account, idx, 1), headers)
+
+    endpoint = _ENDPOINT_TEMPLATES[idx]
+    page = 1
+    pages: t.Iterator[t.Tuple[bool, t.Optional[list]]] = iter([(ok, payload)])
 
-            got = True
+    ex = ThreadPoolExecutor(max_workers=PAGE_CONCURRENCY)
+    try:
+        while True:
+            ok, payload = next(pages, (None, None))
+            if ok is None:
+                # fenêtre épuisée : on lance les PAGE_CONCURRENCY pages suivantes d'un coup
+                window = [endpoint_url(account, idx, p) for p in range(page, page + PAGE_CONCURRENCY)]
+                pages = ex.map(lambda u: try_fetch_endpoint(u, headers), window)
+                continue
+            if not ok:
+                return
             if not payload:
-                _log(f"[API] page={page} items=0 total={total}")
-                break
+                _log("[API] page=%s items=0 total=%s", page, total)
+                return
 
-            for itm in payload:
-                rows.append(normalize_item(itm).to_row())
+            yield from [normalize_item(itm) for itm in payload]
+            total += len(payload)
 
-            total = len(rows)
-            _log(f"[API] page={page} items={len(payload)} total={total}")
+            _log("[API] page=%s items=%s total=%s", page, len(payload), total)
 
-            # JS (overview) : souvent tout d'un bloc → stop dès la 1re page qui répond
-            if endpoint.endswith(".js") or "/overview" in endpoint:
-                return rows
+            # overview : souvent tout d'un bloc → stop dès la 1re page qui répond
+            # (locations.js, lui, est paginé comme le JSON)
+            if "/overview" in endpoint:
+                return
 
             # JSON paginé : si < PER_PAGE → terminé
             if len(payload) < PER_PAGE:
-                return rows
-
-            break  # prochaine page
-
-        if not got:
-            if page == 1 and not rows:
-                raise requests.HTTPError(f"All endpoints 404/unsupported for account {account}.")
-            return rows
+                return
 
-        page += 1
+            page += 1
+    finally:
+        # une page courte/vide termine le scrape : on n'attend pas les pages
+        # spéculatives au-delà de la fin (retries/Retry-After possibles)
+        ex.shutdown(wait=False, cancel_futures=True)
 
 
 # ---------- Extraction store_id dans la page ----------
@@ -265,50 +461,102 @@ _PATTERNS = [
     re.compile(r"data-account\s*=\s*\"(u\d+)\"", re.I),
     re.compile(r"data-stockist-account\s*=\s*\"(u\d+)\"", re.I),
 ]
-
-def fetch_html(url: str) -> str:
-    _log(f"[STATIC] GET {url}")
-    headers = {"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml"}
-    r = requests.get(url, headers=headers, timeout=HTTP_TIMEOUT)
-    r.raise_for_status()
-    r.encoding = r.apparent_encoding or r.encoding
-    return r.text or ""
+# Les mêmes patterns fusionnés en une seule alternance : un seul passage sur le HTML
+_PATTERNS_RE = re.compile("|".join(f"(?:{p.pattern})" for p in _PATTERNS), re.I)
+_STOCKIST_WORD_RE = re.compile("stockist", re.I)
+_ACCOUNT_WORD_RE = re.compile("account", re.I)
 
 def find_stockist_id_in_html(html: str) -> t.Optional[str]:
     if not html:
         return None
-    for pat in _PATTERNS:
-        m = pat.search(html)
-        if m:
-            return m.group(1)
+    # pré-filtre : tous les patterns contiennent "stockist" ou "account"
+    if not _STOCKIST_WORD_RE.search(html) and not _ACCOUNT_WORD_RE.search(html):
+        return None
+    m = _PATTERNS_RE.search(html)
+    if m:
+        return next(g for g in m.groups() if g)
     return None
 
 
+def stream_stockist_id(url: str) -> t.Optional[str]:
+    """
+    Télécharge la page par morceaux et applique find_stockist_id_in_html :
+    on s'arrête dès que le store_id apparaît (souvent dans le <head>), sinon
+    toute la page est parcourue.
+    """
+    _log("[STATIC] GET (stream) %s", url)
+    with _SESSION.get(url, headers=HTML_HEADERS, timeout=HTTP_TIMEOUT, stream=True) as r:
+        r.raise_for_status()
+        try:
+            decoder = codecs.getincrementaldecoder(r.encoding or "utf-8")(errors="replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+        # on garde la fin du morceau précédent pour ne pas couper un match en deux
+        tail = ""
+        for chunk in r.iter_content(chunk_size=STREAM_CHUNK):
+            buf = tail + decoder.decode(chunk)
+            acc = find_stockist_id_in_html(buf)
+            if acc:
+                return acc
+            tail = buf[-STREAM_OVERLAP:]
+        return find_stockist_id_in_html(tail + decoder.decode(b"", final=True))
+
+
+@lru_cache(maxsize=256)
+def _account_from_page(url: str) -> str:
+    # Mis en cache par URL ; une page sans store_id lève, donc n'est pas mise en cache
+    acc = stream_stockist_id(url)
+    if not acc:
+        raise RuntimeError("Impossible de déterminer le store_id Stockist depuis la page.")
+    return acc
+
+
 # ---------- Entrée principale ----------
 
-def scrape_stockist(url: str) -> t.List[dict]:
-    _log(f"[ENTRY] url={url}")
+_ACCOUNT_ID_RE = re.compile(r"u?(\d+)", re.I | re.ASCII)
+
+
+def resolve_account(url: str) -> str:
+    # ID Stockist saisi directement (ex: 12345 ou u12345) → pas de page à télécharger
+    m = _ACCOUNT_ID_RE.fullmatch(url)
+    if m:
+        acc = f"u{m.group(1)}"
+        _log("[ENTRY] store_id fourni → %s", acc)
+        return acc
 
     if STOCKIST_ACCOUNT_ENV:
-        _log(f"[FALLBACK] DEFAULT_ACCOUNT={STOCKIST_ACCOUNT_ENV}")
-        return fetch_all_locations(STOCKIST_ACCOUNT_ENV, url)
+        _log("[FALLBACK] DEFAULT_ACCOUNT=%s", STOCKIST_ACCOUNT_ENV)
+        return STOCKIST_ACCOUNT_ENV
 
     if DEFAULT_ACCOUNT:
-        _log(f"[FALLBACK] DEFAULT_ACCOUNT={DEFAULT_ACCOUNT}")
-        return fetch_all_locations(DEFAULT_ACCOUNT, url)
+        _log("[FALLBACK] DEFAULT_ACCOUNT=%s", DEFAULT_ACCOUNT)
+        return DEFAULT_ACCOUNT
+
+    # Lecture de la page : seulement si aucun compte n'est configuré
+    # (DEFAULT_ACCOUNT vidé et STOCKIST_ACCOUNT absent)
+    acc = _account_from_page(url)
+    _log("[STATIC] store_id trouvé → %s", acc)
+    return acc
 
-    html = fetch_html(url)
-    acc = find_stockist_id_in_html(html)
-    if acc:
-        _log(f"[STATIC] store_id trouvé → {acc}")
-        return fetch_all_locations(acc, url)
 
-    raise RuntimeError("Impossible de déterminer le store_id Stockist depuis la page.")
+def _referer(url: str) -> str:
+    # un store_id saisi directement n'est pas une page : pas de Referer
+    return "" if _ACCOUNT_ID_RE.fullmatch(url) else url
+
+
+def scrape_stockist(url: str) -> t.List[dict]:
+    _log("[ENTRY] url=%s", url)
+    return fetch_all_locations(resolve_account(url), _referer(url))
 
 
 if __name__ == "__main__":
     test_url = os.getenv("TEST_URL", "https://pieceandlove.fr/pages/distributeurs")
-    out = scrape_stockist(test_url)
-    print(f"Stores: {len(out)}")
-    for r in out[:3]:
-        print(r)
+    # écrit au fil des pages sur stdout (les stores ne sont pas gardés en mémoire)
+    rows = iter_all_locations(resolve_account(test_url), _referer(test_url))
+    if os.getenv("FORMAT") == "ndjson":
+        dump_rows_ndjson(rows, sys.stdout.buffer)
+    else:
+        writer = csv.DictWriter(sys.stdout, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+import requests
+
+import scraper
+
+
+def _rows(n):
+    return [{"name": f"s{i}"} for i in range(n)]
+
+
+def test_locations_js_is_paginated(monkeypatch):
+    seen = []
+
+    def fake_fetch(url, headers):
+        seen.append(url)
+        if "/locations.js?" not in url:
+            return False, None
+        page = int(url.split("page=", 1)[1].split("&", 1)[0])
+        return True, _rows({1: scraper.PER_PAGE, 2: 3}.get(page, 0))
+
+    monkeypatch.setattr(scraper, "try_fetch_endpoint", fake_fetch)
+    monkeypatch.setattr(scraper, "_ENDPOINT_CACHE", {})
+
+    rows = list(scraper.iter_all_locations("u1", "https://example.com/"))
+    assert len(rows) == scraper.PER_PAGE + 3
+    assert any("/locations.js?page=2&" in u for u in seen)
+
+
+def _fake_probe(monkeypatch, behaviours):
+    """behaviours[i] = (délai, résultat ou exception) pour le pattern i."""
+    urls = {u: i for i, u in enumerate(scraper.build_candidates("u1", 1, per_page=1))}
+    seen = []
+
+    def fake_fetch(url, headers):
+        seen.append(url)
+        delay, res = behaviours.get(urls[url], (0, (False, None)))
+        time.sleep(delay)
+        if isinstance(res, Exception):
+            raise res
+        return res
+
+    monkeypatch.setattr(scraper, "try_fetch_endpoint", fake_fetch)
+    return seen
+
+
+def test_probe_waits_for_higher_priority_patterns(monkeypatch):
+    # #2 répond en premier mais #1 passe avant dès que #0 a échoué
+    _fake_probe(monkeypatch, {
+        0: (0.2, (False, None)),
+        1: (0.1, (True, _rows(1))),
+        2: (0, (True, _rows(1))),
+    })
+    assert scraper.probe_endpoints("u1", {}) == 1
+
+
+def test_probe_slow_first_pattern_still_wins(monkeypatch):
+    seen = _fake_probe(monkeypatch, {
+        0: (0.2, (True, _rows(1))),
+        3: (0, (True, _rows(1))),
+    })
+    assert scraper.probe_endpoints("u1", {}) == 0
+    assert all("per_page=1" in u for u in seen)
+
+
+def test_probe_skips_errors_and_empty_payloads(monkeypatch):
+    _fake_probe(monkeypatch, {
+        0: (0, requests.ConnectionError("boom")),
+        1: (0, (True, [])),
+        2: (0.05, (True, _rows(1))),
+    })
+    assert scraper.probe_endpoints("u1", {}) == 2
+
+
+def test_probe_accepts_empty_endpoint_when_nothing_has_stores(monkeypatch):
+    _fake_probe(monkeypatch, {1: (0, (True, [])), 4: (0, (True, []))})
+    assert scraper.probe_endpoints("u1", {}) == 1
+
+
+def test_probe_raises_when_every_pattern_fails(monkeypatch):
+    _fake_probe(monkeypatch, {2: (0, requests.ConnectionError("boom"))})
+    with pytest.raises(requests.ConnectionError):
+        scraper.probe_endpoints("u1", {})
+
+
+def test_short_page_does_not_wait_for_speculative_pages(monkeypatch):
+    release = threading.Event()
+    done = []
+
+    def fake_fetch(url, headers):
+        page = int(url.split("page=", 1)[1].split("&", 1)[0])
+        if page > 2:
+            release.wait(5)  # page au-delà de la fin, lente (retries…)
+            done.append(page)
+            return True, []
+        return True, _rows(scraper.PER_PAGE if page == 1 else 3)
+
+    monkeypatch.setattr(scraper, "try_fetch_endpoint", fake_fetch)
+    monkeypatch.setattr(scraper, "_ENDPOINT_CACHE", {"u1": 0})
+
+    try:
+        rows = list(scraper.iter_all_locations("u1", "https://example.com/"))
+        assert len(rows) == scraper.PER_PAGE + 3
+        assert done == []  # rendu la main sans attendre les pages 3+
+    finally:
+        release.set()
+
+
+def test_bare_store_id_is_ascii_and_sends_no_referer(monkeypatch):
+    assert scraper.resolve_account("U12345") == "u12345"
+    assert scraper.resolve_account("١٢٣") != "u١٢٣"
+
+    seen = []
+
+    def fake_fetch(url, headers):
+        seen.append(headers)
+        return True, _rows(1)
+
+    monkeypatch.setattr(scraper, "try_fetch_endpoint", fake_fetch)
+    monkeypatch.setattr(scraper, "_ENDPOINT_CACHE", {})
+    monkeypatch.setattr(scraper, "_ROWS_CACHE", {})
+
+    scraper.scrape_stockist("12345")
+    assert seen and all("Referer" not in h for h in seen)
+    seen.clear()
+    scraper.scrape_stockist("https://example.com/stores")
+    assert seen and all(h["Referer"] == "https://example.com/stores" for h in seen)
@@ -0,0 +1,15 @@
+from scraper import find_stockist_id_in_html
+
+
+def test_first_match_in_document_wins():
+    html = 'data-account="u1"' + "x" * 2000 + ' stockist data-stockist-account="u2"'
+    assert find_stockist_id_in_html(html) == "u1"
+
+
+def test_offsets_not_shifted_by_lowercasing():
+    html = "İ" * 5000 + "stockist" + " " * 300 + 'data-account="u3"'
+    assert find_stockist_id_in_html(html) == "u3"
+
+
+def test_no_marker_returns_none():
+    assert find_stockist_id_in_html("<p>nothing here</p>") is None
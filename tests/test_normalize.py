@@ -0,0 +1,18 @@
+import io
+import json
+
+from scraper import dump_rows_ndjson, normalize_item
+
+
+def test_non_finite_coordinates_become_null():
+    rows = [normalize_item({"name": "A", "lat": "nan", "lng": float("inf")}),
+            normalize_item({"name": "B", "latitude": "48.85", "longitude": 2})]
+    assert rows[0]["lat"] is None and rows[0]["lng"] is None
+    assert (rows[1]["lat"], rows[1]["lng"]) == (48.85, 2.0)
+
+    buf = io.BytesIO()
+    dump_rows_ndjson(rows, buf)
+    lines = buf.getvalue().decode("utf-8").splitlines()
+    # JSON strict : NaN/Infinity refusés
+    parsed = [json.loads(l, parse_constant=lambda c: 1 / 0) for l in lines]
+    assert parsed[0]["lat"] is None
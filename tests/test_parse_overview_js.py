@@ -0,0 +1,47 @@
+import json
+import time
+
+from scraper import parse_overview_js
+
+
+def test_picks_locations_array():
+    js = 'var a = 1; Stockist.locations = [{"name": "A", "city": "B]\\"["}, {"name": "C"}]; x = [{"foo": 1}];'
+    assert parse_overview_js(js) == [{"name": "A", "city": 'B]"['}, {"name": "C"}]
+
+
+def test_nested_arrays_keep_all_rows():
+    stores = [{"name": f"n{i}", "city": "c", "lat": 1.0, "lng": 2.0, "tags": [1, [2]]} for i in range(3000)]
+    js = "w.foo = " + json.dumps(stores) + ";"
+    assert len(parse_overview_js(js)) == 3000
+
+
+def test_nested_array_found_when_outer_is_not_json():
+    js = 'x = {a: [{"name": "in", "lat": 1}], b: [{"x": 1}]}; y = [{bad js}];'
+    assert parse_overview_js(js) == [{"name": "in", "lat": 1}]
+
+
+def test_stray_quote_in_js_before_data():
+    js = 'var q=\'"\';Stockist.locations=[{"name":"A","city":"B"}];'
+    assert parse_overview_js(js) == [{"name": "A", "city": "B"}]
+
+
+def test_regex_literal_with_quote_before_data():
+    js = 'var re=/"/g; x = [{"name":"A"}];'
+    assert parse_overview_js(js) == [{"name": "A"}]
+
+
+def _best_time(js):
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        assert parse_overview_js(js) == []
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def test_unclosed_arrays_stay_linear():
+    # 8x plus de texte : ~8x plus de temps en linéaire, ~64x en quadratique
+    for unit in ("[{", '[{ "a": 1 ', '\\"', "'\"", "=/[/]"):
+        small = _best_time(unit * 5000 + "[{")
+        large = _best_time(unit * 40000 + "[{")
+        assert large < 24 * small